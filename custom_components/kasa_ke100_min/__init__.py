@@ -1,25 +1,76 @@
 
 from __future__ import annotations
 import logging
+import time
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
-from .const import DOMAIN, CONF_HOST, CONF_USERNAME, CONF_PASSWORD, CONF_SCAN_INTERVAL
+from homeassistant.helpers.storage import Store
+from .const import (
+    DOMAIN, CONF_HOST, CONF_USERNAME, CONF_PASSWORD, CONF_SCAN_INTERVAL,
+    CONF_RATE_LIMIT, CONF_RATE_BURST, DEFAULT_RATE_LIMIT, DEFAULT_RATE_BURST, CONF_MAC,
+)
 from .api import KasaKe100Client
 from .coordinator import KasaKe100Coordinator
+from .profiling import async_register_services, async_unregister_services
 
 _LOGGER = logging.getLogger(__name__)
 
 # Add 'sensor' so T310 are set up as sensors alongside existing platforms
 PLATFORMS: list[str] = ["climate", "sensor", "binary_sensor"]
 
+STORAGE_VERSION = 1
+
+# Runtime counters change every poll; write them at most this often (seconds)
+RUNTIME_SAVE_DELAY = 60
+
+def _pending_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.pending")
+
+def _runtime_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.runtime")
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     host = entry.data.get(CONF_HOST)
     username = entry.data.get(CONF_USERNAME)
     password = entry.data.get(CONF_PASSWORD)
     scan_seconds = entry.options.get(CONF_SCAN_INTERVAL) or entry.data.get(CONF_SCAN_INTERVAL)
 
-    client = KasaKe100Client(host, username, password)
+    client = KasaKe100Client(
+        host,
+        username,
+        password,
+        rate_limit=entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+        rate_burst=entry.options.get(CONF_RATE_BURST, DEFAULT_RATE_BURST),
+        mac=entry.data.get(CONF_MAC),
+    )
+
+    # Persist the hub's MAC and follow it to a new address after DHCP changes
+    def _host_changed(new_host: str, mac: str) -> None:
+        if entry.data.get(CONF_HOST) != new_host or entry.data.get(CONF_MAC) != mac:
+            hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_HOST: new_host, CONF_MAC: mac})
+    client.set_host_listener(_host_changed)
+
+    # Commands for unreachable TRVs survive restarts until the next successful poll
+    store = _pending_store(hass, entry)
+    client.load_pending(await store.async_load())
+    client.set_pending_listener(lambda pending: store.async_delay_save(lambda: pending, 1))
+
+    # Heating runtime counters continue across restarts
+    runtime_store = _runtime_store(hass, entry)
+    client.load_runtime(await runtime_store.async_load())
+    # A delayed save re-scheduled on every poll would never fire; throttle instead
+    last_runtime_save = 0.0
+
+    def _runtime_changed(_runtime) -> None:
+        nonlocal last_runtime_save
+        now = time.monotonic()
+        if now - last_runtime_save < RUNTIME_SAVE_DELAY:
+            return
+        last_runtime_save = now
+        runtime_store.async_delay_save(lambda: client.runtime, 1)
+    client.set_runtime_listener(_runtime_changed)
+
     try:
         await client.async_connect()
     except Exception as err:
@@ -36,14 +87,38 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "client": client,
         "coordinator": coordinator,
+        "store": store,
+        "runtime_store": runtime_store,
+        "options": dict(entry.options),
     }
 
+    async_register_services(hass)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(coordinator.async_track_entity_registry(entry))
+    # Scan interval and request budget are applied at setup; reload when options change
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
     return True
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    # Data-only updates (host/MAC learned by the client) must not trigger a reload
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if data is not None and data["options"] == dict(entry.options):
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     data = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
     if data and (client := data.get("client")):
+        client.set_pending_listener(None)
+        await data["store"].async_save(client.pending)
+        client.set_runtime_listener(None)
+        await data["runtime_store"].async_save(client.runtime)
         await client.async_close()
+    if not hass.data.get(DOMAIN):
+        async_unregister_services(hass)
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await _pending_store(hass, entry).async_remove()
+    await _runtime_store(hass, entry).async_remove()
@@ -1,17 +1,164 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
-from typing import Dict, Optional, Any
+from dataclasses import dataclass, asdict, replace
+from datetime import timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any, Tuple
+from contextlib import aclosing, contextmanager
 import asyncio
+import ipaddress
 import logging
+import math
+import time
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_RATE_LIMIT, DEFAULT_RATE_BURST, DEFAULT_WARM_INTERVAL,
+    DEFAULT_DISCOVERY_TIMEOUT, DISCOVERY_CONCURRENCY, DEFAULT_LIVENESS_INTERVAL,
+    MIN_RESOLVE_INTERVAL, REMOVED_DEVICE_GRACE, PLAIN_CONNECT_TIMEOUT, PROBE_TIMEOUT, BROADCAST_SHARE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Day order matches the week_day bitmask of the hub schedule rules (bit 0 = Sunday)
+SCHEDULE_DAYS = ("sun", "mon", "tue", "wed", "thu", "fri", "sat")
+
+# Polling tiers: hot (temperatures, contact) comes with every hub poll,
+# warm (setpoint, mode) needs a per-child update. Battery, signal and
+# firmware arrive with those same reads; the hub offers no separate cheaper
+# query for them, so they are not gated separately.
+TIER_WARM = "warm"
+TIER_LIVENESS = "liveness"
+
+# Polls further apart than this (restart, hub outage) are not counted as runtime
+MAX_RUNTIME_GAP = 15 * 60
+
+# Keys of the per-device pending command queue
+CMD_STATE = "on"
+CMD_TARGET_TEMP = "target_temp"
+
 
 def _import_kasa():
     # Import in thread executor to avoid blocking the HA event loop
     from kasa import Discover, Module  # type: ignore
     return Discover, Module
 
+async def _async_import_kasa():
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _import_kasa)
+    except Exception as e:
+        raise RuntimeError("python-kasa ist nicht installiert oder fehlerhaft.") from e
+
+def _is_unreachable_error(err: BaseException) -> bool:
+    """True for connectivity/timeout failures worth queueing; False for device rejections."""
+    if isinstance(err, (TimeoutError, OSError)):
+        return True
+    # python-kasa is imported lazily, so match its exception classes by name
+    names = {cls.__name__ for cls in type(err).__mro__}
+    if names & {"_ConnectionError", "_RetryableError"}:
+        return True
+    code = getattr(err, "error_code", None)
+    return "TIMEOUT" in str(getattr(code, "name", "")).upper()
+
+# Last known host of every hub seen by discovery, keyed by normalized MAC
+_HUB_HOSTS: Dict[str, str] = {}
+
+def norm_mac(mac: Any) -> str | None:
+    if not mac:
+        return None
+    s = "".join(c for c in str(mac).lower() if c in "0123456789abcdef")
+    return s if len(s) == 12 else None
+
+def _is_hub(dev) -> bool:
+    dev_type = str(getattr(dev, "device_type", "") or "").lower()
+    model = str(getattr(dev, "model", "") or "").upper()
+    return dev_type.endswith("hub") or model.startswith(("KH", "H1"))
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
+
+def _timeouts(seconds: float) -> Dict[str, int]:
+    # python-kasa only takes whole seconds, for discovery and for the connection itself
+    seconds = max(1, int(seconds))
+    return {"discovery_timeout": seconds, "timeout": seconds}
+
+async def _async_close_quietly(dev) -> None:
+    try:
+        await dev.disconnect()
+    except Exception:
+        pass
+
+async def async_discover_hubs(
+    username: str | None = None,
+    password: str | None = None,
+    *,
+    subnet: str | None = None,
+    timeout: float = DEFAULT_DISCOVERY_TIMEOUT,
+    want_mac: str | None = None,
+) -> Dict[str, str]:
+    """Find KH100 hubs and return ``{mac: host}``; also refreshes the MAC cache.
+
+    A broadcast runs first; if *subnet* is given, its hosts are then probed with
+    at least DISCOVERY_CONCURRENCY requests in flight, more if the whole subnet
+    would not fit the rest of the budget otherwise. Everything shares one
+    *timeout* budget, and probing stops early once *want_mac* has been found.
+    """
+    Discover, _ = await _async_import_kasa()
+    found: Dict[str, str] = {}
+    deadline = time.monotonic() + timeout
+    # The subnet probe needs most of the budget; the broadcast gets a short slice
+    broadcast_timeout = timeout if subnet is None else timeout * BROADCAST_SHARE
+
+    def _record(dev, host: str) -> None:
+        if _is_hub(dev) and (mac := norm_mac(getattr(dev, "mac", None))):
+            found[mac] = host
+            _HUB_HOSTS[mac] = host
+
+    try:
+        devices = await Discover.discover(
+            discovery_timeout=max(1, int(broadcast_timeout)),
+            username=username,
+            password=password,
+        )
+    except Exception as err:
+        _LOGGER.debug("Broadcast discovery failed: %s", err)
+        devices = {}
+    for host, dev in (devices or {}).items():
+        _record(dev, host)
+        await _async_close_quietly(dev)
+
+    if subnet is None or (want_mac is not None and want_mac in found):
+        return found
+
+    hosts = [str(ip) for ip in ipaddress.ip_network(subnet, strict=False).hosts()]
+    # Enough probes in flight that every host gets its turn before the deadline
+    rounds = max(1, int(_remaining(deadline) // PROBE_TIMEOUT))
+    sem = asyncio.Semaphore(max(DISCOVERY_CONCURRENCY, math.ceil(len(hosts) / rounds)))
+    done = asyncio.Event()
+
+    async def _probe(host: str) -> None:
+        async with sem:
+            if done.is_set() or host in found.values():
+                return
+            try:
+                dev = await Discover.discover_single(
+                    host, username=username, password=password, **_timeouts(PROBE_TIMEOUT)
+                )
+            except Exception:
+                return
+            _record(dev, host)
+            await _async_close_quietly(dev)
+            if want_mac is not None and want_mac in found:
+                done.set()
+
+    tasks = [asyncio.create_task(_probe(h)) for h in hosts]
+    try:
+        await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return found
+
 @dataclass
 class TRVState:
     device_id: str
@@ -22,6 +169,9 @@ class TRVState:
     hvac_action: str         # "heating" | "idle" | "off"
     battery: int | None
     online: bool = True
+    rssi: int | None = None
+    signal: int | None = None
+    firmware: str | None = None
 
 @dataclass
 class ContactState:
@@ -30,9 +180,66 @@ class ContactState:
     is_open: bool
     battery: int | None
     online: bool = True
+    rssi: int | None = None
+    signal: int | None = None
+    firmware: str | None = None
+
+class RequestBudget:
+    """Token bucket shared by every request sent to one hub.
+
+    Commands wait for a token; background polling only takes a token when one
+    is free and no command is queued, so polls shed load instead of competing.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = max(float(rate), 0.01)
+        self._burst = max(int(burst), 1)
+        self._tokens = float(self._burst)
+        self._stamp = time.monotonic()
+        self._priority_waiters = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+    @contextmanager
+    def priority(self):
+        self._priority_waiters += 1
+        try:
+            yield
+        finally:
+            self._priority_waiters -= 1
+
+    def try_acquire(self) -> bool:
+        if self._priority_waiters:
+            return False
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
 
 class KasaKe100Client:
-    def __init__(self, host: str, username: str | None = None, password: str | None = None) -> None:
+    def __init__(
+        self,
+        host: str,
+        username: str | None = None,
+        password: str | None = None,
+        rate_limit: float = DEFAULT_RATE_LIMIT,
+        rate_burst: int = DEFAULT_RATE_BURST,
+        warm_interval: float = DEFAULT_WARM_INTERVAL,
+        mac: str | None = None,
+        liveness_interval: float = DEFAULT_LIVENESS_INTERVAL,
+    ) -> None:
         self._host = host
         self._username = username
         self._password = password
@@ -42,33 +249,143 @@ class KasaKe100Client:
         self._devices: Dict[str, TRVState | ContactState] = {}
         self._child_by_id: Dict[str, Any] = {}
         self._Module = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_listener: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None
+        self._budget = RequestBudget(rate_limit, rate_burst)
+        self._poll_cursor = 0
+        self._tier_intervals = {TIER_WARM: float(warm_interval)}
+        self._tier_stamp: Dict[str, Dict[str, float]] = {}
+        self._mac = norm_mac(mac)
+        self._host_listener: Optional[Callable[[str, str], None]] = None
+        self._last_resolve: Optional[float] = None
+        self._absent_since: Dict[str, float] = {}
+        self._runtime: Dict[str, Dict[str, Any]] = {}
+        self._inactive: set[str] = set()
+        self._liveness_interval = float(liveness_interval)
+        self._runtime_listener: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def mac(self) -> str | None:
+        return self._mac
+
+    def set_host_listener(self, listener: Optional[Callable[[str, str], None]]) -> None:
+        """Called with ``(host, mac)`` whenever the hub's host or MAC becomes known or changes."""
+        self._host_listener = listener
 
     async def async_connect(self) -> None:
         async with self._lock:
-            if self._connected and self._hub is not None:
-                return
-            try:
-                loop = asyncio.get_running_loop()
-                Discover, Module = await loop.run_in_executor(None, _import_kasa)
-            except Exception as e:
-                raise RuntimeError("python-kasa ist nicht installiert oder fehlerhaft.") from e
-            self._Module = Module
+            await self._async_connect_locked()
 
-            self._hub = await Discover.discover_single(
+    async def _async_connect_locked(self) -> None:
+        if self._connected and self._hub is not None:
+            return
+        Discover, Module = await _async_import_kasa()
+        self._Module = Module
+
+        # Connect and any re-resolution share one deadline, since this runs under the
+        # client lock inside a coordinator poll and blocks commands meanwhile
+        deadline = time.monotonic() + DEFAULT_DISCOVERY_TIMEOUT
+        resolve = self._mac is not None and self._resolve_due()
+        try:
+            async with asyncio.timeout(DEFAULT_DISCOVERY_TIMEOUT):
+                hub = await self._async_connect_host(Discover, resolve, deadline)
+        except TimeoutError:
+            hub = None
+        if hub is None:
+            raise RuntimeError(f"Cannot discover KH100 hub at {self._host}")
+        self._hub = hub
+        self._connected = True
+        mac = norm_mac(getattr(hub, "mac", None))
+        if mac is not None and mac != self._mac:
+            self._mac = mac
+            self._notify_host()
+        if self._mac is not None:
+            _HUB_HOSTS[self._mac] = self._host
+        _LOGGER.debug("Connected to KH100 hub at %s", self._host)
+
+    async def _async_connect_host(self, Discover, resolve: bool, deadline: float):
+        # A known hub gets a short attempt: it leaves the deadline to a re-resolution, and
+        # between re-resolutions it keeps the lock short while the hub stays unreachable
+        budget = PLAIN_CONNECT_TIMEOUT if self._mac is not None else _remaining(deadline)
+        try:
+            hub = await Discover.discover_single(
                 self._host,
                 username=self._username,
                 password=self._password,
+                **_timeouts(min(budget, _remaining(deadline))),
             )
-            if self._hub is None:
-                raise RuntimeError(f"Cannot discover KH100 hub at {self._host}")
-            self._connected = True
-            _LOGGER.debug("Connected to KH100 hub at %s", self._host)
+        except Exception as err:
+            if self._mac is None:
+                raise
+            _LOGGER.debug("KH100 not reachable at %s (%s)", self._host, err)
+            hub = None
+        if hub is not None and self._mac is not None and norm_mac(getattr(hub, "mac", None)) not in (None, self._mac):
+            # Another device took over the old address
+            await _async_close_quietly(hub)
+            hub = None
+        if hub is None and resolve:
+            _LOGGER.debug("Re-resolving KH100 %s by MAC", self._mac)
+            self._last_resolve = time.monotonic()
+            hub = await self._async_resolve_by_mac(Discover, deadline)
+        return hub
+
+    def _resolve_due(self) -> bool:
+        # Broadcast + subnet probe is expensive; in between only the plain reconnect runs
+        return self._last_resolve is None or time.monotonic() - self._last_resolve >= MIN_RESOLVE_INTERVAL
+
+    async def _async_try_host(self, Discover, host: str, timeout: float):
+        try:
+            hub = await Discover.discover_single(
+                host, username=self._username, password=self._password, **_timeouts(timeout)
+            )
+        except Exception:
+            return None
+        if norm_mac(getattr(hub, "mac", None)) not in (None, self._mac):
+            await _async_close_quietly(hub)
+            return None
+        return hub
+
+    async def _async_resolve_by_mac(self, Discover, deadline: float):
+        host = _HUB_HOSTS.get(self._mac)
+        hub = None
+        if host is not None and host != self._host:
+            hub = await self._async_try_host(Discover, host, min(PLAIN_CONNECT_TIMEOUT, _remaining(deadline)))
+        if hub is None:
+            try:
+                subnet = str(ipaddress.ip_network(f"{self._host}/24", strict=False))
+            except ValueError:
+                subnet = None  # hostname, rely on broadcast only
+            # Keep enough of the deadline to connect to the host that is found
+            found = await async_discover_hubs(
+                self._username, self._password, subnet=subnet, want_mac=self._mac,
+                timeout=max(1.0, _remaining(deadline) - PLAIN_CONNECT_TIMEOUT),
+            )
+            host = found.get(self._mac)
+            if host is not None:
+                hub = await self._async_try_host(Discover, host, _remaining(deadline))
+        if hub is None:
+            return None
+        if host != self._host:
+            _LOGGER.info("KH100 hub %s moved from %s to %s", self._mac, self._host, host)
+            self._host = host
+            self._notify_host()
+        return hub
+
+    def _notify_host(self) -> None:
+        if self._host_listener is not None and self._mac is not None:
+            self._host_listener(self._host, self._mac)
 
     async def async_close(self) -> None:
         async with self._lock:
             self._connected = False
-            self._hub = None
+            hub, self._hub = self._hub, None
             self._child_by_id.clear()
+            if hub is not None:
+                await _async_close_quietly(hub)
 
     @staticmethod
     def _derive_device_id(dev) -> str:
@@ -165,97 +482,238 @@ class KasaKe100Client:
                 pass
         return None
 
+    def _due_tiers(self, dev_id: str) -> set[str]:
+        now = time.monotonic()
+        stamps = self._tier_stamp.get(dev_id) or {}
+        return {
+            tier for tier, interval in self._tier_intervals.items()
+            if tier not in stamps or now - stamps[tier] >= interval
+        }
+
+    def set_inactive_devices(self, device_ids: set[str]) -> None:
+        """Devices left out of regular polling (all their HA entities are disabled)."""
+        self._inactive = set(device_ids)
+
+    def _liveness_due(self, dev_id: str) -> bool:
+        stamp = (self._tier_stamp.get(dev_id) or {}).get(TIER_LIVENESS)
+        return stamp is None or time.monotonic() - stamp >= self._liveness_interval
+
+    def _mark_tiers(self, dev_id: str, tiers: set[str]) -> None:
+        now = time.monotonic()
+        stamps = self._tier_stamp.setdefault(dev_id, {})
+        for tier in tiers:
+            stamps[tier] = now
+
+    def _read_diagnostic_fields(self, child, *mods) -> Dict[str, Any]:
+        battery = self._get_attr_any(child, ["battery"])
+        for mod in mods:
+            if battery is None and mod is not None:
+                battery = self._get_attr_any(mod, ["battery"])
+        hw_info = self._get_attr_any(child, ["hw_info"]) or {}
+        return {
+            "battery": battery,
+            "rssi": self._get_attr_any(child, ["rssi"]),
+            "signal": self._get_attr_any(child, ["signal_level", "signal"]),
+            "firmware": hw_info.get("sw_ver") if isinstance(hw_info, dict) else None,
+        }
+
+    def _has_thermostat(self, child) -> bool:
+        modules = getattr(child, "modules", {}) or {}
+        return self._get_module(modules, getattr(self._Module, "Thermostat", None), "Thermostat") is not None
+
+    def _extract_state(self, child, dev_id: str) -> TRVState | ContactState | None:
+        name = getattr(child, "alias", None) or getattr(child, "name", None) or f"Device {dev_id}"
+
+        modules = getattr(child, "modules", {}) or {}
+
+        thermo = self._get_module(modules, getattr(self._Module, "Thermostat", None), "Thermostat")
+        temp_mod = self._get_module(modules, getattr(self._Module, "TemperatureSensor", None), "TemperatureSensor")
+        device_mod = self._get_module(modules, getattr(self._Module, "DeviceModule", None), "DeviceModule")
+        contact = self._get_module(modules, getattr(self._Module, "ContactSensor", None), "ContactSensor")
+
+        if thermo is not None or temp_mod is not None:
+            cur = self._get_attr_any(thermo, ["current_temperature", "temperature"]) if thermo is not None else None
+            if cur is None:
+                cur = self._get_attr_any(temp_mod, ["current_temperature", "temperature"]) if temp_mod is not None else None
+
+            tgt = self._get_attr_any(thermo, ["target_temperature", "setpoint"]) if thermo is not None else None
+            if tgt is None:
+                tgt = self._get_attr_any(child, ["target_temperature", "setpoint", "target_temp"])
+
+            mode_obj = self._get_attr_any(thermo, ["mode"])
+            hvac_from_mode = self._thermo_mode_to_hvac(mode_obj)
+
+            power_on = self._norm_power(
+                mode_obj,
+                self._get_attr_any(thermo, ["is_on", "power", "enabled", "active", "on"]),
+                self._get_attr_any(device_mod, ["is_on", "power", "enabled", "active", "on"]),
+                self._get_attr_any(device_mod, ["mode"]),
+                self._get_attr_any(child, ["is_on", "power", "enabled", "active", "on", "mode"]),
+            )
+            heat_flag = self._get_attr_any(thermo, ["heating", "is_heating", "heating_active", "heat_on"])
+
+            if hvac_from_mode is not None:
+                hvac_mode, hvac_action = hvac_from_mode
+            else:
+                if power_on is False:
+                    hvac_mode, hvac_action = ("off", "off")
+                elif heat_flag is True:
+                    hvac_mode, hvac_action = ("heat", "heating")
+                else:
+                    hvac_mode, hvac_action = ("heat", "idle")
+
+            return TRVState(
+                device_id=dev_id,
+                name=name,
+                current_temp=cur,
+                target_temp=tgt,
+                hvac_mode=hvac_mode,
+                hvac_action=hvac_action,
+                online=True,
+                **self._read_diagnostic_fields(child, thermo, temp_mod),
+            )
+
+        if contact is not None:
+            is_open = bool(self._get_attr_any(contact, ["is_open"], False))
+            return ContactState(
+                device_id=dev_id,
+                name=name,
+                is_open=is_open,
+                online=True,
+                **self._read_diagnostic_fields(child, contact),
+            )
+        return None
+
+    def _prune_removed(self, children: list) -> None:
+        """Forget per-device bookkeeping of devices no longer paired with the hub.
+
+        A child can drop out of the hub's list for a while (battery swap,
+        range), so runtime counters and queued commands are only dropped once
+        the device has been absent for REMOVED_DEVICE_GRACE. An empty list is
+        treated as a glitch and prunes nothing.
+        """
+        for dev_id in self._tier_stamp.keys() - self._child_by_id.keys():
+            del self._tier_stamp[dev_id]
+        if not children:
+            return
+        now = time.monotonic()
+        absent = (self._runtime.keys() | self._pending.keys()) - self._child_by_id.keys()
+        self._absent_since = {dev_id: self._absent_since.get(dev_id, now) for dev_id in absent}
+        removed = {dev_id for dev_id, since in self._absent_since.items() if now - since >= REMOVED_DEVICE_GRACE}
+        for dev_id in removed:
+            del self._absent_since[dev_id]
+            self._runtime.pop(dev_id, None)
+        if removed & self._pending.keys():
+            for dev_id in removed & self._pending.keys():
+                del self._pending[dev_id]
+            self._notify_pending()
+
+    def _state_dict(self, dev_id: str, st: TRVState | ContactState) -> Dict[str, Any]:
+        out = asdict(st)
+        out["pending"] = dict(self._pending.get(dev_id) or {})
+        if dev_id in self._runtime:
+            out["runtime"] = self._runtime_dict(dev_id)
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"devices": {dev_id: self._state_dict(dev_id, st) for dev_id, st in self._devices.items()}}
+
     async def async_refresh(self) -> Dict[str, Dict[str, Any]]:
+        async with aclosing(self.async_refresh_stream()) as stream:
+            async for _ in stream:
+                pass
+        return self.snapshot()
+
+    async def async_refresh_stream(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Poll the hub, yielding ``(device_id, state)`` as soon as each child has been read.
+
+        Devices whose per-child read is postponed by the request budget are
+        still yielded with the fields the hub update refreshed; the committed
+        state is available via :meth:`snapshot` once the stream ends.
+        """
         await self.async_connect()
         async with self._lock:
-            await self._hub.update()
+            if not self._budget.try_acquire():
+                _LOGGER.debug("Request budget exhausted; skipping poll of %s", self._host)
+                return
+            try:
+                await self._hub.update()
+            except Exception:
+                if self._mac is None:
+                    raise
+                # The hub may have moved; reconnect (re-resolving by MAC) within this poll
+                self._connected = False
+                hub, self._hub = self._hub, None
+                await _async_close_quietly(hub)
+                await self._async_connect_locked()
+                await self._hub.update()
 
             devices: Dict[str, TRVState | ContactState] = {}
             self._child_by_id.clear()
 
-            for child in getattr(self._hub, "children", []):
-                try:
-                    await child.update()
-                except Exception:
-                    continue
-
+            # Start where the last budget-limited poll stopped so no child starves
+            children = list(getattr(self._hub, "children", []))
+            start = self._poll_cursor % len(children) if children else 0
+            stopped_at: Optional[int] = None
+            for idx, child in enumerate(children[start:] + children[:start]):
                 dev_id = self._derive_device_id(child)
                 self._child_by_id[dev_id] = child
-                name = getattr(child, "alias", None) or getattr(child, "name", None) or f"Device {dev_id}"
-
-                modules = getattr(child, "modules", {}) or {}
-
-                thermo = self._get_module(modules, getattr(self._Module, "Thermostat", None), "Thermostat")
-                temp_mod = self._get_module(modules, getattr(self._Module, "TemperatureSensor", None), "TemperatureSensor")
-                device_mod = self._get_module(modules, getattr(self._Module, "DeviceModule", None), "DeviceModule")
-                contact = self._get_module(modules, getattr(self._Module, "ContactSensor", None), "ContactSensor")
-
-                if thermo is not None or temp_mod is not None:
-                    cur = self._get_attr_any(thermo, ["current_temperature", "temperature"]) if thermo is not None else None
-                    if cur is None:
-                        cur = self._get_attr_any(temp_mod, ["current_temperature", "temperature"]) if temp_mod is not None else None
-
-                    tgt = self._get_attr_any(thermo, ["target_temperature", "setpoint"]) if thermo is not None else None
-                    if tgt is None:
-                        tgt = self._get_attr_any(child, ["target_temperature", "setpoint", "target_temp"])
-
-                    mode_obj = self._get_attr_any(thermo, ["mode"])
-                    hvac_from_mode = self._thermo_mode_to_hvac(mode_obj)
-
-                    power_on = self._norm_power(
-                        mode_obj,
-                        self._get_attr_any(thermo, ["is_on", "power", "enabled", "active", "on"]),
-                        self._get_attr_any(device_mod, ["is_on", "power", "enabled", "active", "on"]),
-                        self._get_attr_any(device_mod, ["mode"]),
-                        self._get_attr_any(child, ["is_on", "power", "enabled", "active", "on", "mode"]),
-                    )
-                    heat_flag = self._get_attr_any(thermo, ["heating", "is_heating", "heating_active", "heat_on"])
-
-                    if hvac_from_mode is not None:
-                        hvac_mode, hvac_action = hvac_from_mode
-                    else:
-                        if power_on is False:
-                            hvac_mode, hvac_action = ("off", "off")
-                        elif heat_flag is True:
-                            hvac_mode, hvac_action = ("heat", "heating")
-                        else:
-                            hvac_mode, hvac_action = ("heat", "idle")
-
-                    battery = self._get_attr_any(child, ["battery"])
-                    if battery is None and thermo is not None:
-                        battery = self._get_attr_any(thermo, ["battery"])
-                    if battery is None and temp_mod is not None:
-                        battery = self._get_attr_any(temp_mod, ["battery"])
-
-                    devices[dev_id] = TRVState(
-                        device_id=dev_id,
-                        name=name,
-                        current_temp=cur,
-                        target_temp=tgt,
-                        hvac_mode=hvac_mode,
-                        hvac_action=hvac_action,
-                        battery=battery,
-                        online=True,
-                    )
+                if dev_id in self._inactive and not self._liveness_due(dev_id):
+                    # All entities disabled in HA: only an occasional liveness read
+                    if dev_id in self._devices:
+                        devices[dev_id] = self._devices[dev_id]
                     continue
+                due = self._due_tiers(dev_id)
+                if dev_id in self._inactive:
+                    # The liveness read is a real per-child update, stamped only once it ran
+                    due.update((TIER_WARM, TIER_LIVENESS))
+                if dev_id in self._pending:
+                    # Queued commands are only replayed after a read proved the device reachable
+                    due.add(TIER_WARM)
+                read_ok = skipped = False
+                if due and not self._budget.try_acquire():
+                    # Only the per-child read waits for budget; the hot fields came with the hub update
+                    skipped = True
+                    if stopped_at is None:
+                        stopped_at = (start + idx) % len(children)
+                elif due:
+                    try:
+                        await child.update()
+                    except Exception:
+                        # Keep the last known state (and its queued commands) visible, marked offline
+                        prev = self._devices.get(dev_id)
+                        if prev is not None:
+                            devices[dev_id] = replace(prev, online=False)
+                            yield dev_id, self._state_dict(dev_id, devices[dev_id])
+                        continue
+                    self._mark_tiers(dev_id, due)
+                    read_ok = True
 
-                if contact is not None:
-                    is_open = bool(self._get_attr_any(contact, ["is_open"], False))
-                    battery = self._get_attr_any(child, ["battery"]) or self._get_attr_any(contact, ["battery"])
-                    devices[dev_id] = ContactState(
-                        device_id=dev_id,
-                        name=name,
-                        is_open=is_open,
-                        battery=battery,
-                        online=True,
-                    )
-                    continue
+                if read_ok and dev_id in self._pending and await self._flush_pending(dev_id, child):
+                    try:
+                        await self._budget.acquire()
+                        await child.update()
+                    except Exception:
+                        pass
+                st = self._extract_state(child, dev_id)
+                prev = self._devices.get(dev_id)
+                if st is not None and skipped and prev is not None and not prev.online:
+                    # Unconfirmed by a per-child read, so the device stays offline
+                    st = replace(st, online=False)
+                if st is not None:
+                    devices[dev_id] = st
+                    if isinstance(st, TRVState) and self._has_thermostat(child):
+                        # Only TRVs heat; T310/T315 sensors share TRVState but get no counters
+                        self._track_runtime(dev_id, st.hvac_action == "heating", time.time())
+                    elif dev_id in self._runtime:
+                        del self._runtime[dev_id]
+                    yield dev_id, self._state_dict(dev_id, st)
 
+            self._poll_cursor = stopped_at or 0
             self._devices = devices
-            out: Dict[str, Any] = {"devices": {}}
-            for dev_id, st in self._devices.items():
-                out["devices"][dev_id] = asdict(st)
-            return out
+            self._prune_removed(children)
+            if self._runtime_listener is not None and self._runtime:
+                self._runtime_listener(self.runtime)
 
     def _get_child(self, device_id: str):
         dev = self._child_by_id.get(device_id)
@@ -266,35 +724,331 @@ class KasaKe100Client:
                     return child
         return dev
 
-    async def async_set_target_temp(self, device_id: str, temperature: float) -> None:
-        async with self._lock:
-            child = self._get_child(device_id)
-            if child is None:
-                raise ValueError(f"Device {device_id} not found")
-            modules = getattr(child, "modules", {}) or {}
+    def _resolve_command(self, child, kind: str):
+        modules = getattr(child, "modules", {}) or {}
+        if kind == CMD_TARGET_TEMP:
             thermo = self._get_module(modules, getattr(self._Module, "Thermostat", None), "Thermostat")
             if thermo is not None:
                 setter = getattr(thermo, "set_target_temperature", None) or getattr(thermo, "set_temperature", None)
                 if setter is None:
                     raise RuntimeError("Thermostat module has no setter for target temperature")
-                await setter(float(temperature))
-                return
+                return lambda value: setter(float(value))
             if hasattr(child, "set_target_temperature"):
-                await child.set_target_temperature(float(temperature))
-                return
+                return lambda value: child.set_target_temperature(float(value))
             raise RuntimeError("No way to set target temperature on this device")
-
-    async def async_set_state(self, device_id: str, on: bool) -> None:
-        async with self._lock:
-            child = self._get_child(device_id)
-            if child is None:
-                raise ValueError(f"Device {device_id} not found")
-            modules = getattr(child, "modules", {}) or {}
+        if kind == CMD_STATE:
             device_mod = self._get_module(modules, getattr(self._Module, "DeviceModule", None), "DeviceModule")
             if device_mod and hasattr(device_mod, "set_on"):
-                await device_mod.set_on(bool(on))
-                return
+                return lambda value: device_mod.set_on(bool(value))
             if hasattr(child, "set_on"):
-                await child.set_on(bool(on))
-                return
+                return lambda value: child.set_on(bool(value))
             raise RuntimeError("No way to switch device on/off")
+        raise ValueError(f"Unknown command {kind!r}")
+
+    async def _async_send_command(self, device_id: str, kind: str, value: Any) -> None:
+        # Registering as priority makes a running poll yield its remaining child reads
+        with self._budget.priority():
+            async with self._lock:
+                child = self._get_child(device_id)
+                if child is None:
+                    raise ValueError(f"Device {device_id} not found")
+                command = self._resolve_command(child, kind)
+                await self._budget.acquire()
+                try:
+                    await command(value)
+                except Exception as err:
+                    if not _is_unreachable_error(err):
+                        raise
+                    _LOGGER.debug("Queueing %s=%s for unreachable device %s: %s", kind, value, device_id, err)
+                    self._queue_command(device_id, kind, value)
+                    return
+                self._drop_command(device_id, kind)
+                # Read setpoint/mode back on the next poll instead of waiting for the warm tier
+                self._tier_stamp.get(device_id, {}).pop(TIER_WARM, None)
+
+    async def async_set_target_temp(self, device_id: str, temperature: float) -> None:
+        await self._async_send_command(device_id, CMD_TARGET_TEMP, float(temperature))
+
+    async def async_set_state(self, device_id: str, on: bool) -> None:
+        await self._async_send_command(device_id, CMD_STATE, bool(on))
+
+    # ---- heating runtime counters ----
+    @property
+    def runtime(self) -> Dict[str, Dict[str, Any]]:
+        return {dev_id: dict(rt) for dev_id, rt in self._runtime.items()}
+
+    def load_runtime(self, data: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        self._runtime = {str(dev_id): dict(rt) for dev_id, rt in (data or {}).items() if rt}
+
+    def set_runtime_listener(self, listener: Optional[Callable[[Dict[str, Dict[str, Any]]], None]]) -> None:
+        self._runtime_listener = listener
+
+    @staticmethod
+    def _period_starts(now: float) -> tuple[float, float]:
+        # HA's configured time zone, not the OS one
+        midnight = dt_util.start_of_local_day(dt_util.as_local(dt_util.utc_from_timestamp(now)))
+        monday = midnight - timedelta(days=midnight.weekday())
+        return midnight.timestamp(), monday.timestamp()
+
+    def _track_runtime(self, dev_id: str, heating: bool, now: float) -> None:
+        """Advance the counters of one TRV by the time since its last observation."""
+        rt = self._runtime.get(dev_id)
+        if rt is None:
+            rt = self._runtime[dev_id] = {
+                "heating": False, "stamp": None, "day": None, "week": None,
+                "day_s": 0.0, "day_obs_s": 0.0, "week_s": 0.0, "total_s": 0.0, "cycles": 0,
+            }
+        day_start, week_start = self._period_starts(now)
+        if rt["day"] != day_start:
+            rt["day"], rt["day_s"], rt["day_obs_s"] = day_start, 0.0, 0.0
+        if rt["week"] != week_start:
+            rt["week"], rt["week_s"] = week_start, 0.0
+
+        stamp = rt["stamp"]
+        if stamp is not None and 0 < now - stamp <= MAX_RUNTIME_GAP:
+            # The previously observed action is assumed to have held until now
+            elapsed = now - stamp
+            day_elapsed = min(elapsed, now - day_start)
+            rt["day_obs_s"] += day_elapsed
+            if rt["heating"]:
+                rt["day_s"] += day_elapsed
+                rt["week_s"] += min(elapsed, now - week_start)
+                rt["total_s"] += elapsed
+        if heating and not rt["heating"]:
+            rt["cycles"] += 1
+        rt["heating"] = heating
+        rt["stamp"] = now
+
+    def _runtime_dict(self, dev_id: str) -> Dict[str, Any]:
+        rt = self._runtime[dev_id]
+        return {
+            "heating_today": round(rt["day_s"]),
+            "heating_week": round(rt["week_s"]),
+            "heating_total": round(rt["total_s"]),
+            "heating_cycles": rt["cycles"],
+            "duty_cycle_today": round(100 * rt["day_s"] / rt["day_obs_s"], 1) if rt["day_obs_s"] else None,
+        }
+
+    # ---- pending command queue ----
+    @property
+    def pending(self) -> Dict[str, Dict[str, Any]]:
+        return {dev_id: dict(cmds) for dev_id, cmds in self._pending.items()}
+
+    def load_pending(self, data: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        self._pending = {
+            str(dev_id): {k: v for k, v in (cmds or {}).items() if k in (CMD_STATE, CMD_TARGET_TEMP)}
+            for dev_id, cmds in (data or {}).items()
+            if cmds
+        }
+
+    def set_pending_listener(self, listener: Optional[Callable[[Dict[str, Dict[str, Any]]], None]]) -> None:
+        self._pending_listener = listener
+
+    def _notify_pending(self) -> None:
+        if self._pending_listener is not None:
+            self._pending_listener(self.pending)
+
+    def _queue_command(self, device_id: str, kind: str, value: Any) -> None:
+        cmds = self._pending.setdefault(device_id, {})
+        # Later writes supersede earlier ones and move to the end of the replay order
+        cmds.pop(kind, None)
+        cmds[kind] = value
+        self._notify_pending()
+
+    def _drop_command(self, device_id: str, kind: str) -> None:
+        cmds = self._pending.get(device_id)
+        if not cmds or kind not in cmds:
+            return
+        del cmds[kind]
+        if not cmds:
+            del self._pending[device_id]
+        self._notify_pending()
+
+    async def _flush_pending(self, device_id: str, child) -> bool:
+        """Replay queued commands in order; returns True if at least one was applied."""
+        applied = False
+        for kind, value in list((self._pending.get(device_id) or {}).items()):
+            try:
+                await self._budget.acquire()
+                await self._resolve_command(child, kind)(value)
+            except Exception as err:
+                if _is_unreachable_error(err):
+                    _LOGGER.debug("Pending %s=%s for %s still failing: %s", kind, value, device_id, err)
+                    break
+                # The device rejected it; replaying would fail forever
+                _LOGGER.warning("Dropping pending %s=%s for %s: %s", kind, value, device_id, err)
+                self._drop_command(device_id, kind)
+                continue
+            self._drop_command(device_id, kind)
+            applied = True
+        return applied
+
+    # ---- native weekly schedule ----
+    @staticmethod
+    def _schedule_to_rules(schedule: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Identical transitions on several days are merged into one rule (week_day bitmask)
+        masks: Dict[tuple, int] = {}
+        for day, entries in schedule.items():
+            if day not in SCHEDULE_DAYS:
+                raise ValueError(f"Unknown schedule day {day!r}")
+            bit = 1 << SCHEDULE_DAYS.index(day)
+            for entry in entries or []:
+                hh, mm = str(entry["time"]).split(":")
+                minute = int(hh) * 60 + int(mm)
+                if not 0 <= minute < 24 * 60:
+                    raise ValueError(f"Invalid schedule time {entry['time']!r}")
+                temp = float(entry["temperature"])
+                if not temp.is_integer():
+                    raise ValueError(f"Schedule temperature must be a whole degree, got {entry['temperature']!r}")
+                key = (minute, int(temp))
+                masks[key] = masks.get(key, 0) | bit
+        rules: List[Dict[str, Any]] = []
+        for (minute, temp), mask in sorted(masks.items()):
+            rules.append({
+                "enable": True,
+                "mode": "repeat",
+                "week_day": mask,
+                "s_type": "normal",
+                "s_min": minute,
+                "e_type": "normal",
+                "e_min": 0,
+                "time_offset": 0,
+                "desired_states": {"temp": temp},
+            })
+        return rules
+
+    @staticmethod
+    def _is_weekly_rule(rule: Dict[str, Any]) -> bool:
+        """True for enabled repeating temperature rules, the only kind the schedule services manage."""
+        return (
+            bool(rule.get("enable", True))
+            and rule.get("mode", "repeat") == "repeat"
+            and (rule.get("desired_states") or {}).get("temp") is not None
+            and rule.get("s_min") is not None
+        )
+
+    @classmethod
+    def _rules_to_schedule(cls, rules: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        schedule: Dict[str, List[Dict[str, Any]]] = {day: [] for day in SCHEDULE_DAYS}
+        for rule in rules:
+            if not cls._is_weekly_rule(rule):
+                continue
+            temp = rule["desired_states"]["temp"]
+            minute = rule["s_min"]
+            mask = int(rule.get("week_day") or 0)
+            for i, day in enumerate(SCHEDULE_DAYS):
+                if mask & (1 << i):
+                    schedule[day].append({
+                        "time": f"{int(minute) // 60:02d}:{int(minute) % 60:02d}",
+                        "temperature": int(temp),
+                    })
+        for entries in schedule.values():
+            entries.sort(key=lambda e: e["time"])
+        return schedule
+
+    @staticmethod
+    def diff_schedule(
+        current: Dict[str, List[Dict[str, Any]]],
+        desired: Dict[str, List[Dict[str, Any]]],
+    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Return per-day transitions that are only on the device ("removed") or only in *desired* ("added")."""
+        def _key(e: Dict[str, Any]) -> tuple:
+            hh, mm = str(e["time"]).split(":")
+            return (int(hh), int(mm), int(e["temperature"]))
+
+        diff: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for day in SCHEDULE_DAYS:
+            cur = {_key(e): e for e in current.get(day) or []}
+            want = {_key(e): e for e in desired.get(day) or []}
+            added = [want[k] for k in sorted(want.keys() - cur.keys())]
+            removed = [cur[k] for k in sorted(cur.keys() - want.keys())]
+            if added or removed:
+                diff[day] = {"added": added, "removed": removed}
+        return diff
+
+    async def async_get_schedule(self, device_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        with self._budget.priority():
+            async with self._lock:
+                child = self._get_child(device_id)
+                if child is None:
+                    raise ValueError(f"Device {device_id} not found")
+                return self._rules_to_schedule(await self._read_schedule_rules(child))
+
+    async def async_set_schedule(
+        self, device_id: str, schedule: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Upload *schedule* to the device's native schedule; returns the diff that was applied.
+
+        Days missing from *schedule* keep their current transitions on the
+        device; an empty list clears a day. Disabled and one-shot rules are
+        not part of the weekly schedule and are re-uploaded unchanged.
+        """
+        self._schedule_to_rules(schedule)  # validate before touching the device
+        with self._budget.priority():
+            async with self._lock:
+                child = self._get_child(device_id)
+                if child is None:
+                    raise ValueError(f"Device {device_id} not found")
+                current_rules = await self._read_schedule_rules(child)
+                current = self._rules_to_schedule(current_rules)
+                merged = {day: schedule.get(day, current[day]) for day in SCHEDULE_DAYS}
+                rules = self._schedule_to_rules(merged)
+                desired = self._rules_to_schedule(rules)
+                kept = [
+                    {k: v for k, v in rule.items() if k != "id"}
+                    for rule in current_rules if not self._is_weekly_rule(rule)
+                ]
+                diff = self.diff_schedule(current, desired)
+                if not diff:
+                    return diff
+                query = self._get_query_helper(child)
+                try:
+                    await query("remove_schedule_rules", {"remove_all": True})
+                    for rule in kept + rules:
+                        await query("add_schedule_rule", rule)
+                except Exception as err:
+                    await self._restore_schedule_rules(query, current_rules, device_id)
+                    raise RuntimeError(
+                        f"Schedule upload to {device_id} failed midway ({err}); "
+                        "the previous schedule was restored"
+                    ) from err
+                readback = self._rules_to_schedule(await self._read_schedule_rules(child))
+                if self.diff_schedule(readback, desired):
+                    raise RuntimeError(f"Schedule read-back mismatch on {device_id}")
+                return diff
+
+    @staticmethod
+    async def _restore_schedule_rules(query, rules: List[Dict[str, Any]], device_id: str) -> None:
+        try:
+            await query("remove_schedule_rules", {"remove_all": True})
+            for rule in rules:
+                await query("add_schedule_rule", {k: v for k, v in rule.items() if k != "id"})
+        except Exception as err:
+            raise RuntimeError(
+                f"Schedule upload to {device_id} failed midway and the previous schedule "
+                f"could not be restored ({err}); the device schedule is incomplete"
+            ) from err
+
+    def _get_query_helper(self, child):
+        query = getattr(child, "_query_helper", None)
+        if query is None:
+            raise RuntimeError("Device does not support native schedules")
+
+        async def _budgeted(method: str, params: Dict[str, Any]):
+            await self._budget.acquire()
+            return await query(method, params)
+        return _budgeted
+
+    async def _read_schedule_rules(self, child) -> List[Dict[str, Any]]:
+        query = self._get_query_helper(child)
+        rules: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            resp = await query("get_schedule_rules", {"start_index": start}) or {}
+            if "get_schedule_rules" in resp:
+                resp = resp["get_schedule_rules"] or {}
+            page = resp.get("rule_list") or []
+            rules.extend(page)
+            start += len(page)
+            if not page or start >= int(resp.get("sum", 0)):
+                return rules
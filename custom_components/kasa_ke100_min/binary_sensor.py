@@ -1,8 +1,8 @@
 from __future__ import annotations
 from homeassistant.components.binary_sensor import BinarySensorEntity, BinarySensorDeviceClass
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN, MANUFACTURER, MODEL_KE100
 from .coordinator import KasaKe100Coordinator
+from .entity import KasaKe100DeviceEntity
 
 async def async_setup_entry(hass, entry, async_add_entities):
     data = hass.data[DOMAIN][entry.entry_id]
@@ -21,12 +21,11 @@ async def async_setup_entry(hass, entry, async_add_entities):
     _check_devices()
     entry.async_on_unload(coordinator.async_add_listener(_check_devices))
 
-class KeContactEntity(CoordinatorEntity, BinarySensorEntity):
+class KeContactEntity(KasaKe100DeviceEntity, BinarySensorEntity):
     _attr_device_class = BinarySensorDeviceClass.WINDOW
 
     def __init__(self, coordinator: KasaKe100Coordinator, device_id: str) -> None:
-        super().__init__(coordinator)
-        self._id = device_id
+        super().__init__(coordinator, device_id)
         self._attr_unique_id = f"{device_id}_contact"
 
     @property
@@ -50,6 +49,3 @@ class KeContactEntity(CoordinatorEntity, BinarySensorEntity):
             "model": MODEL_KE100,
             "name": self.name,
         }
-
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
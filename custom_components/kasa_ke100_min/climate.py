@@ -4,13 +4,38 @@ from typing import Any, Dict, Set, Optional, List
 import re
 from homeassistant.components.climate import ClimateEntity, ClimateEntityFeature, HVACMode, HVACAction
 from homeassistant.const import ATTR_TEMPERATURE, UnitOfTemperature, PRECISION_TENTHS, PRECISION_WHOLE
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.helpers import entity_registry as er
-from .const import DOMAIN, MANUFACTURER, MODEL_KE100
+from homeassistant.core import SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er, entity_platform
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from .const import DOMAIN, MANUFACTURER, MODEL_KE100, SERVICE_SET_SCHEDULE, SERVICE_GET_SCHEDULE, ATTR_SCHEDULE
 from .coordinator import KasaKe100Coordinator
+from .entity import KasaKe100DeviceEntity
+from .api import SCHEDULE_DAYS
 
 PARALLEL_UPDATES = 0
 
+def _whole_degrees(value: Any) -> int:
+    # Like the setpoint, schedule temperatures are whole degrees only; 21.5 is rejected, not truncated
+    try:
+        temp = float(value)
+    except (TypeError, ValueError) as err:
+        raise vol.Invalid(f"invalid temperature {value!r}") from err
+    if not temp.is_integer():
+        raise vol.Invalid(f"temperature must be a whole degree, got {value!r}")
+    return int(temp)
+
+_SCHEDULE_ENTRY = vol.Schema({
+    vol.Required("time"): cv.matches_regex(r"^([01]\d|2[0-3]):[0-5]\d$"),
+    vol.Required("temperature"): vol.All(_whole_degrees, vol.Range(min=5, max=30)),
+})
+SET_SCHEDULE_SCHEMA = {
+    vol.Required(ATTR_SCHEDULE): vol.Schema({
+        vol.In(SCHEDULE_DAYS): [_SCHEDULE_ENTRY],
+    }),
+}
+
 def _str_to_float(x):
     try:
         return float(x) if x is not None else None
@@ -77,8 +102,18 @@ async def async_setup_entry(hass, entry, async_add_entities):
     _check_devices()
     entry.async_on_unload(coordinator.async_add_listener(_check_devices))
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_SET_SCHEDULE, SET_SCHEDULE_SCHEMA, "async_set_schedule",
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    platform.async_register_entity_service(
+        SERVICE_GET_SCHEDULE, {}, "async_get_schedule",
+        supports_response=SupportsResponse.ONLY,
+    )
+
 # ---- KE100 TRV (steuerbar) ----
-class Ke100ClimateEntity(CoordinatorEntity, ClimateEntity):
+class Ke100ClimateEntity(KasaKe100DeviceEntity, ClimateEntity):
     _attr_supported_features: int = (ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.TURN_ON | ClimateEntityFeature.TURN_OFF)
     _attr_hvac_modes = [HVACMode.HEAT, HVACMode.OFF]
     _attr_precision = PRECISION_TENTHS   # <<<<<< geändert
@@ -88,8 +123,7 @@ class Ke100ClimateEntity(CoordinatorEntity, ClimateEntity):
     _attr_max_temp = 30
 
     def __init__(self, coordinator: KasaKe100Coordinator, device_id: str) -> None:
-        super().__init__(coordinator)
-        self._id = device_id
+        super().__init__(coordinator, device_id)
         self._attr_unique_id = device_id
 
     @property
@@ -132,6 +166,11 @@ class Ke100ClimateEntity(CoordinatorEntity, ClimateEntity):
             return HVACAction.OFF
         return None
 
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        pending = self._st.get("pending") or {}
+        return {"pending_commands": pending} if pending else {}
+
     async def async_set_temperature(self, **kwargs: Any) -> None:
         temp = kwargs.get(ATTR_TEMPERATURE)
         if temp is None:
@@ -155,9 +194,17 @@ class Ke100ClimateEntity(CoordinatorEntity, ClimateEntity):
     async def async_turn_off(self) -> None:
         await self.async_set_hvac_mode(HVACMode.OFF)
 
+    # ---- native hub schedule ----
+    async def async_set_schedule(self, schedule: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        diff = await self.coordinator.client.async_set_schedule(self._id, schedule)
+        return {"changed": bool(diff), "diff": diff}
+
+    async def async_get_schedule(self) -> Dict[str, Any]:
+        return {ATTR_SCHEDULE: await self.coordinator.client.async_get_schedule(self._id)}
+
 
 # ---- T310 als "Climate-Display" (nur Anzeige) ----
-class T310ClimateDisplayEntity(CoordinatorEntity, ClimateEntity):
+class T310ClimateDisplayEntity(KasaKe100DeviceEntity, ClimateEntity):
     # Keine Steuerfunktionen; keine auswählbaren Modi
     _attr_supported_features = ClimateEntityFeature(0)
     _attr_hvac_modes: list[HVACMode] = []
@@ -167,8 +214,7 @@ class T310ClimateDisplayEntity(CoordinatorEntity, ClimateEntity):
     _attr_max_temp = 0
 
     def __init__(self, coordinator: KasaKe100Coordinator, device_id: str) -> None:
-        super().__init__(coordinator)
-        self._id = device_id
+        super().__init__(coordinator, device_id)
         self._attr_unique_id = f"{device_id}_t310_display"
 
     @property
@@ -250,6 +296,12 @@ class T310ClimateDisplayEntity(CoordinatorEntity, ClimateEntity):
         # No action shown
         return None
 
+    async def async_set_schedule(self, schedule: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        raise HomeAssistantError(f"{self.entity_id} is read-only and has no schedule")
+
+    async def async_get_schedule(self) -> Dict[str, Any]:
+        raise HomeAssistantError(f"{self.entity_id} is read-only and has no schedule")
+
     @property
     def extra_state_attributes(self) -> Dict[str, Any]:
         attrs: Dict[str, Any] = {}
@@ -3,10 +3,15 @@ from typing import Any, Optional
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.data_entry_flow import FlowResult
-from .const import DOMAIN, CONF_HOST, CONF_USERNAME, CONF_PASSWORD, CONF_SCAN_INTERVAL
+from .const import (
+    DOMAIN, CONF_HOST, CONF_USERNAME, CONF_PASSWORD, CONF_SCAN_INTERVAL,
+    CONF_RATE_LIMIT, CONF_RATE_BURST, DEFAULT_RATE_LIMIT, DEFAULT_RATE_BURST, CONF_MAC,
+)
+from .api import async_discover_hubs, KasaKe100Client
 
 DATA_SCHEMA = vol.Schema({
-    vol.Required(CONF_HOST): str,
+    # Leave empty to search the network for KH100 hubs
+    vol.Optional(CONF_HOST): str,
     vol.Optional(CONF_USERNAME): str,
     vol.Optional(CONF_PASSWORD): str,
     vol.Optional(CONF_SCAN_INTERVAL, default=10): vol.All(int, vol.Range(min=5, max=600)),
@@ -15,13 +20,57 @@ DATA_SCHEMA = vol.Schema({
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    def __init__(self) -> None:
+        self._user_input: dict[str, Any] = {}
+        self._discovered: dict[str, str] = {}
+
     async def async_step_user(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
         if user_input is None:
             return self.async_show_form(step_id="user", data_schema=DATA_SCHEMA)
 
+        if not user_input.get(CONF_HOST):
+            self._user_input = user_input
+            self._discovered = await async_discover_hubs(
+                user_input.get(CONF_USERNAME), user_input.get(CONF_PASSWORD)
+            )
+            if not self._discovered:
+                return self.async_show_form(
+                    step_id="user", data_schema=DATA_SCHEMA, errors={"base": "no_devices_found"}
+                )
+            return await self.async_step_pick()
+
+        return await self._async_create(user_input)
+
+    async def async_step_pick(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
+        if user_input is None:
+            hubs = {mac: f"{host} ({mac})" for mac, host in self._discovered.items()}
+            return self.async_show_form(
+                step_id="pick", data_schema=vol.Schema({vol.Required(CONF_MAC): vol.In(hubs)})
+            )
+        mac = user_input[CONF_MAC]
+        return await self._async_create({**self._user_input, CONF_HOST: self._discovered[mac], CONF_MAC: mac})
+
+    async def _async_create(self, user_input: dict[str, Any]) -> FlowResult:
         host = user_input[CONF_HOST]
-        await self.async_set_unique_id(host)
-        self._abort_if_unique_id_configured()
+        self._async_abort_entries_match({CONF_HOST: host})
+        mac = user_input.get(CONF_MAC)
+        if mac is None:
+            # Best effort: learn the MAC so the entry can follow the hub across IP changes
+            client = KasaKe100Client(host, user_input.get(CONF_USERNAME), user_input.get(CONF_PASSWORD))
+            try:
+                await client.async_connect()
+                mac = client.mac
+            except Exception:
+                mac = None
+            finally:
+                await client.async_close()
+        if mac is not None:
+            user_input = {**user_input, CONF_MAC: mac}
+            await self.async_set_unique_id(mac)
+            self._abort_if_unique_id_configured(updates={CONF_HOST: host})
+        else:
+            await self.async_set_unique_id(host)
+            self._abort_if_unique_id_configured()
 
         return self.async_create_entry(title=f"KH100 ({host})", data=user_input)
 
@@ -45,8 +94,12 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         current = {
             CONF_SCAN_INTERVAL: self.entry.options.get(CONF_SCAN_INTERVAL, self.entry.data.get(CONF_SCAN_INTERVAL, 10)),
+            CONF_RATE_LIMIT: self.entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+            CONF_RATE_BURST: self.entry.options.get(CONF_RATE_BURST, DEFAULT_RATE_BURST),
         }
         schema = vol.Schema({
-            vol.Optional(CONF_SCAN_INTERVAL, default=current[CONF_SCAN_INTERVAL]): vol.All(int, vol.Range(min=5, max=600))
+            vol.Optional(CONF_SCAN_INTERVAL, default=current[CONF_SCAN_INTERVAL]): vol.All(int, vol.Range(min=5, max=600)),
+            vol.Optional(CONF_RATE_LIMIT, default=current[CONF_RATE_LIMIT]): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=50)),
+            vol.Optional(CONF_RATE_BURST, default=current[CONF_RATE_BURST]): vol.All(int, vol.Range(min=1, max=100)),
         })
         return self.async_show_form(step_id="init", data_schema=schema)
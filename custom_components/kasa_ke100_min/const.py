@@ -8,5 +8,31 @@ CONF_HOST = "host"
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 CONF_SCAN_INTERVAL = "scan_interval"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_RATE_BURST = "rate_burst"
+CONF_MAC = "mac"
 
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=10)
+# Sustainable KH100 request rate (requests/s) and burst size shared by polls and commands
+DEFAULT_RATE_LIMIT = 2.0
+DEFAULT_RATE_BURST = 8
+# Refresh cadence (seconds) of the warm tier: per-child reads of setpoint/mode
+DEFAULT_WARM_INTERVAL = 60
+# Devices whose entities are all disabled are only read this often (seconds)
+DEFAULT_LIVENESS_INTERVAL = 10 * 60
+# Time budget (seconds) and parallelism for hub discovery / re-resolution by MAC
+DEFAULT_DISCOVERY_TIMEOUT = 10
+DISCOVERY_CONCURRENCY = 32
+# Per-host probe timeout and share of the budget given to the broadcast when a subnet is probed too
+PROBE_TIMEOUT = 1
+BROADCAST_SHARE = 0.2
+# Connect attempt to a known host (seconds) before falling back to a re-resolution
+PLAIN_CONNECT_TIMEOUT = 2
+# Minimum time (seconds) between re-resolutions by MAC while the hub stays unreachable
+MIN_RESOLVE_INTERVAL = 5 * 60
+# Runtime counters and queued commands of a device missing from the hub are kept this long (seconds)
+REMOVED_DEVICE_GRACE = 24 * 60 * 60
+SERVICE_SET_SCHEDULE = "set_schedule"
+SERVICE_GET_SCHEDULE = "get_schedule"
+ATTR_SCHEDULE = "schedule"
+SERVICE_PROFILE = "profile"
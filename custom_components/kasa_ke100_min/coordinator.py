@@ -1,10 +1,14 @@
 
 from __future__ import annotations
-from datetime import timedelta
-from typing import Any, Dict, Optional
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 import logging
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE, Event, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 from .const import DOMAIN, DEFAULT_SCAN_INTERVAL
 from .api import KasaKe100Client
 
@@ -18,9 +22,84 @@ class KasaKe100Coordinator(DataUpdateCoordinator[Dict[str, Any]]):
             name=f"{DOMAIN}_coordinator",
             update_interval=interval,
         )
+        # Per-device fan-out while a poll is still running; full fan-out happens on completion
+        self._device_listeners: Dict[str, List[Callable[[], None]]] = {}
+        self.device_last_updated: Dict[str, datetime] = {}
+        self._published: set[str] = set()
+        self.last_poll_completed: Optional[datetime] = None
+
+    @callback
+    def async_track_entity_registry(self, entry: ConfigEntry) -> CALLBACK_TYPE:
+        """Keep the client's inactive set in sync with entities enabled in HA."""
+        @callback
+        def _recompute(event: Event | None = None) -> None:
+            if event is not None and event.data.get("action") == "update":
+                if "disabled_by" not in (event.data.get("changes") or {}):
+                    return
+            ent_reg = er.async_get(self.hass)
+            dev_reg = dr.async_get(self.hass)
+            seen: set[str] = set()
+            enabled: set[str] = set()
+            for ent in er.async_entries_for_config_entry(ent_reg, entry.entry_id):
+                device = dev_reg.async_get(ent.device_id) if ent.device_id else None
+                if device is None:
+                    continue
+                for domain, dev_id in device.identifiers:
+                    if domain != DOMAIN:
+                        continue
+                    seen.add(dev_id)
+                    if ent.disabled_by is None:
+                        enabled.add(dev_id)
+            # Devices without any registry entity yet stay polled so they can be added
+            self.client.set_inactive_devices(seen - enabled)
+
+        _recompute()
+        return self.hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, _recompute)
+
+    @callback
+    def async_add_device_listener(self, device_id: str, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        listeners = self._device_listeners.setdefault(device_id, [])
+        listeners.append(update_callback)
+
+        @callback
+        def _remove() -> None:
+            listeners.remove(update_callback)
+            if not listeners:
+                self._device_listeners.pop(device_id, None)
+
+        return _remove
+
+    @callback
+    def published_in_last_poll(self, device_id: str) -> bool:
+        """True if the device's entities were already written by the stream of the last poll."""
+        return device_id in self._published
+
+    @callback
+    def _publish_device(self, device_id: str, state: Dict[str, Any]) -> None:
+        self.device_last_updated[device_id] = dt_util.utcnow()
+        if self.data is None:
+            return
+        self.data.setdefault("devices", {})[device_id] = state
+        self._published.add(device_id)
+        for update_callback in list(self._device_listeners.get(device_id, ())):
+            update_callback()
 
     async def _async_update_data(self) -> Dict[str, Any]:
+        self._published = set()
         try:
-            return await self.client.async_refresh()
+            async with aclosing(self.client.async_refresh_stream()) as stream:
+                async for device_id, state in stream:
+                    self._publish_device(device_id, state)
+            data = self.client.snapshot()
         except Exception as err:
+            # Availability changes; every entity must be written on this fan-out
+            self._published = set()
             raise UpdateFailed(err) from err
+        for device_id in self.device_last_updated.keys() - data["devices"].keys():
+            del self.device_last_updated[device_id]
+        if not self.last_update_success:
+            # Streamed writes happened while entities still read as unavailable;
+            # the fan-out after recovery must write them all again
+            self._published = set()
+        self.last_poll_completed = dt_util.utcnow()
+        return data
@@ -0,0 +1,22 @@
+
+from __future__ import annotations
+from typing import Any, Dict
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN, CONF_PASSWORD, CONF_USERNAME
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME}
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    last_poll = coordinator.last_poll_completed
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "last_poll_completed": last_poll.isoformat() if last_poll else None,
+        # Per-device freshness from the streaming refresh
+        "device_last_updated": {
+            dev_id: ts.isoformat() for dev_id, ts in coordinator.device_last_updated.items()
+        },
+        "devices": (coordinator.data or {}).get("devices") or {},
+    }
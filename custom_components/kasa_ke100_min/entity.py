@@ -0,0 +1,27 @@
+
+from __future__ import annotations
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .coordinator import KasaKe100Coordinator
+
+class KasaKe100DeviceEntity(CoordinatorEntity[KasaKe100Coordinator]):
+    """Coordinator entity bound to one hub child.
+
+    State is written from the per-device stream while the poll runs; the
+    coordinator's completion fan-out then only writes entities whose device
+    was not published during that poll (skipped, failed poll, ...).
+    """
+
+    def __init__(self, coordinator: KasaKe100Coordinator, device_id: str) -> None:
+        super().__init__(coordinator)
+        self._id = device_id
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self.coordinator.async_add_device_listener(self._id, self.async_write_ha_state))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if self.coordinator.published_in_last_poll(self._id):
+            return
+        self.async_write_ha_state()
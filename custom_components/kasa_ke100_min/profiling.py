@@ -0,0 +1,74 @@
+
+from __future__ import annotations
+from typing import Any, Dict
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+from .const import DOMAIN, SERVICE_PROFILE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Summary rows are limited to this integration plus the coordinator listener fan-out
+_SUMMARY_FILTER = r"kasa_ke100_min|update_coordinator"
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional("duration", default=30): vol.All(vol.Coerce(float), vol.Range(min=1, max=600)),
+    vol.Optional("top", default=25): vol.All(vol.Coerce(int), vol.Range(min=1, max=200)),
+})
+
+def _write_profile(profiler: cProfile.Profile, prof_path: str, summary_path: str, top: int) -> str:
+    profiler.create_stats()
+    profiler.dump_stats(prof_path)
+    buf = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buf)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_SUMMARY_FILTER, top)
+    summary = buf.getvalue()
+    with open(summary_path, "w", encoding="utf-8") as fh:
+        fh.write(summary)
+    return summary
+
+def async_register_services(hass: HomeAssistant) -> None:
+    if hass.services.has_service(DOMAIN, SERVICE_PROFILE):
+        return
+    # The profiler is only created and enabled inside the service call, so
+    # nothing is hooked into the integration while no profile is running.
+    running = asyncio.Lock()
+
+    async def _async_profile(call: ServiceCall) -> Dict[str, Any]:
+        if running.locked():
+            raise HomeAssistantError("A profile is already running")
+        async with running:
+            duration = call.data["duration"]
+            stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+            prof_path = hass.config.path(f"{DOMAIN}_profile_{stamp}.prof")
+            summary_path = hass.config.path(f"{DOMAIN}_profile_{stamp}.txt")
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as err:
+                raise HomeAssistantError(f"Cannot start profiler: {err}") from err
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                profiler.disable()
+
+            summary = await hass.async_add_executor_job(
+                _write_profile, profiler, prof_path, summary_path, call.data["top"]
+            )
+            _LOGGER.info("Profile written to %s (summary: %s)", prof_path, summary_path)
+            return {"profile": prof_path, "summary_file": summary_path, "summary": summary}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile,
+        schema=PROFILE_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+
+def async_unregister_services(hass: HomeAssistant) -> None:
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
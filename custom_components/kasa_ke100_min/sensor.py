@@ -2,10 +2,10 @@
 from __future__ import annotations
 from typing import Any, Dict
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
-from homeassistant.const import UnitOfTemperature, PERCENTAGE
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from .const import DOMAIN, MANUFACTURER
+from homeassistant.const import UnitOfTemperature, UnitOfTime, PERCENTAGE
+from .const import DOMAIN, MANUFACTURER, MODEL_KE100
 from .coordinator import KasaKe100Coordinator
+from .entity import KasaKe100DeviceEntity
 
 def _is_t310(raw: Dict[str, Any]) -> bool:
     model = (raw.get("model") or raw.get("device_model") or "").upper()
@@ -16,10 +16,17 @@ async def async_setup_entry(hass, entry, async_add_entities):
     coordinator: KasaKe100Coordinator = data["coordinator"]
 
     known = set()
+    known_runtime = set()
 
     def _add():
         ents = []
         for dev_id, raw in (coordinator.data.get("devices") or {}).items():
+            if dev_id not in known_runtime and "runtime" in raw and not _is_t310(raw):
+                ents.append(Ke100HeatingTodaySensor(coordinator, dev_id))
+                ents.append(Ke100HeatingWeekSensor(coordinator, dev_id))
+                ents.append(Ke100HeatingCyclesSensor(coordinator, dev_id))
+                ents.append(Ke100DutyCycleSensor(coordinator, dev_id))
+                known_runtime.add(dev_id)
             if dev_id in known or not _is_t310(raw):
                 continue
             ents.append(T310TemperatureSensor(coordinator, dev_id))
@@ -35,10 +42,9 @@ async def async_setup_entry(hass, entry, async_add_entities):
     _add()
     entry.async_on_unload(coordinator.async_add_listener(_add))
 
-class _BaseT310(CoordinatorEntity, SensorEntity):
+class _BaseT310(KasaKe100DeviceEntity, SensorEntity):
     def __init__(self, coordinator: KasaKe100Coordinator, device_id: str) -> None:
-        super().__init__(coordinator)
-        self._id = device_id
+        super().__init__(coordinator, device_id)
         self._attr_has_entity_name = True
 
     def _raw(self) -> Dict[str, Any]:
@@ -134,3 +140,68 @@ class T310SignalSensor(_BaseT310):
     def native_value(self):
         raw = self._raw()
         return raw.get("rssi", raw.get("signal"))
+
+# ---- KE100 heating runtime (integration-side counters) ----
+class _BaseKe100Runtime(KasaKe100DeviceEntity, SensorEntity):
+    _key: str
+    _suffix: str
+    _label: str
+
+    def __init__(self, coordinator: KasaKe100Coordinator, device_id: str) -> None:
+        super().__init__(coordinator, device_id)
+        self._attr_unique_id = f"{device_id}_{self._suffix}"
+
+    def _raw(self) -> Dict[str, Any]:
+        return (self.coordinator.data.get("devices") or {}).get(self._id) or {}
+
+    @property
+    def name(self) -> str:
+        base = (self._raw().get("name") or f"KE100 {self._id}")
+        return f"{base} {self._label}"
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, self._id)},
+            "manufacturer": MANUFACTURER,
+            "model": MODEL_KE100,
+            "name": self._raw().get("name") or f"KE100 {self._id}",
+        }
+
+    @property
+    def native_value(self):
+        return (self._raw().get("runtime") or {}).get(self._key)
+
+class Ke100HeatingTodaySensor(_BaseKe100Runtime):
+    # Resets at local midnight; total_increasing treats the drop as a new cycle
+    _key = "heating_today"
+    _suffix = "heating_today"
+    _label = "Heizdauer heute"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_unit_of_measurement = UnitOfTime.HOURS
+
+class Ke100HeatingWeekSensor(_BaseKe100Runtime):
+    _key = "heating_week"
+    _suffix = "heating_week"
+    _label = "Heizdauer Woche"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_unit_of_measurement = UnitOfTime.HOURS
+
+class Ke100HeatingCyclesSensor(_BaseKe100Runtime):
+    _key = "heating_cycles"
+    _suffix = "heating_cycles"
+    _label = "Heizzyklen"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_icon = "mdi:counter"
+
+class Ke100DutyCycleSensor(_BaseKe100Runtime):
+    _key = "duty_cycle_today"
+    _suffix = "duty_cycle_today"
+    _label = "Heizanteil heute"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_icon = "mdi:radiator"
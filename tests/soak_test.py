@@ -0,0 +1,273 @@
+"""Soak test: drive the client against a simulated KH100 for a long run.
+
+Runs many polls with device churn, hub reconnects and command bursts and
+fails if memory, per-device bookkeeping, hub connections, listeners or
+asyncio tasks keep growing. The default is a short smoke run of a few
+seconds; set KE100_SOAK_POLLS=300000 for a full soak run.
+"""
+from __future__ import annotations
+import asyncio
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.kasa_ke100_min import api  # noqa: E402
+
+try:
+    import pytest_homeassistant_custom_component  # noqa: F401
+    HAS_HASS_FIXTURE = True
+except ImportError:
+    HAS_HASS_FIXTURE = False
+
+POLLS = int(os.environ.get("KE100_SOAK_POLLS", "1000"))
+ENTRY_CYCLES = max(50, POLLS // 100)
+POLL_SECONDS = 10
+CHILDREN = 12
+CHURN_EVERY = 50
+RECONNECT_EVERY = 997
+CLOSE_EVERY = 5003
+BURST_EVERY = 97
+# Allowed heap growth after warm-up; bounded state stays well below this
+MAX_GROWTH_BYTES = 512 * 1024
+HUB_MAC = "AA:BB:CC:DD:EE:FF"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+class FakeChild:
+    def __init__(self, idx: int) -> None:
+        self.device_id = f"8035{idx:06d}"
+        self.alias = f"TRV {idx}"
+        self.modules = {"Thermostat": self}
+        self.current_temperature = 20.5
+        self.target_temperature = 21.0
+        self.mode = "heating" if idx % 2 else "idle"
+        self.offline = False
+
+    async def update(self) -> None:
+        if self.offline:
+            raise TimeoutError("child offline")
+
+    async def set_target_temperature(self, value: float) -> None:
+        if self.offline:
+            raise TimeoutError("child offline")
+        self.target_temperature = value
+
+
+class FakeHub:
+    """One connection to the simulated hub; all connections share its children."""
+
+    def __init__(self, sim: "HubSim") -> None:
+        self._sim = sim
+        self.mac = HUB_MAC
+        self.children = sim.children
+        sim.open_hubs.add(self)
+
+    async def update(self) -> None:
+        if self._sim.fail_next_update:
+            self._sim.fail_next_update = False
+            raise OSError("connection reset")
+
+    async def disconnect(self) -> None:
+        self._sim.open_hubs.discard(self)
+
+
+class HubSim:
+    def __init__(self) -> None:
+        self.children = [FakeChild(i) for i in range(CHILDREN)]
+        self.next_idx = CHILDREN
+        self.open_hubs: set[FakeHub] = set()
+        self.fail_next_update = False
+
+    def churn(self, rng: random.Random) -> None:
+        self.churn_out(self.children[rng.randrange(len(self.children))])
+
+    def churn_out(self, child: FakeChild) -> None:
+        self.children.remove(child)
+        self.children.append(FakeChild(self.next_idx))
+        self.next_idx += 1
+
+    async def discover_single(self, host, **kwargs) -> FakeHub:
+        return FakeHub(self)
+
+
+@pytest.fixture
+def sim(monkeypatch) -> HubSim:
+    sim = HubSim()
+
+    async def _import_kasa():
+        return SimpleNamespace(discover_single=sim.discover_single), None
+
+    monkeypatch.setattr(api, "_async_import_kasa", _import_kasa)
+    monkeypatch.setattr(api, "time", FakeClock())
+    return sim
+
+
+def test_soak_bounded(sim: HubSim) -> None:
+    asyncio.run(_soak(sim))
+
+
+async def _soak(sim: HubSim) -> None:
+    rng = random.Random(0)
+    clock = api.time
+    client = api.KasaKe100Client("192.0.2.10", mac=HUB_MAC, rate_limit=1e9, rate_burst=10**9)
+    saves = {"pending": 0, "runtime": 0}
+    client.set_pending_listener(lambda pending: saves.__setitem__("pending", saves["pending"] + 1))
+    client.set_runtime_listener(lambda runtime: saves.__setitem__("runtime", saves["runtime"] + 1))
+    client.set_host_listener(lambda host, mac: None)
+    await client.async_connect()
+
+    tasks_before = len(asyncio.all_tasks())
+    warmup = min(5000, POLLS // 4)
+    baseline = None
+    tracemalloc.start()
+    try:
+        for poll in range(POLLS):
+            clock.now += POLL_SECONDS
+            if poll % CHURN_EVERY == 0:
+                sim.churn(rng)
+            if poll % RECONNECT_EVERY == 0:
+                sim.fail_next_update = True
+            if poll % CLOSE_EVERY == 0:
+                await client.async_close()
+            if poll % BURST_EVERY == 0 and client.snapshot()["devices"]:
+                for child in rng.sample(sim.children, 4):
+                    child.offline = rng.random() < 0.3
+                    await client.async_set_target_temp(child.device_id, rng.randint(5, 30))
+            await client.async_refresh()
+            if poll == warmup:
+                gc.collect()
+                baseline = tracemalloc.take_snapshot()
+        gc.collect()
+        final = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    live = {c.device_id for c in sim.children}
+    # Devices churned out within the grace period may still hold counters/commands
+    in_grace = api.REMOVED_DEVICE_GRACE // (POLL_SECONDS * CHURN_EVERY) + 1
+    assert len(client._runtime) <= len(live) + in_grace
+    assert len(client._pending) <= len(live) + in_grace
+    assert len(client._absent_since) <= in_grace
+    assert client._tier_stamp.keys() <= live
+    assert client.snapshot()["devices"].keys() <= live
+    assert client._child_by_id.keys() <= live
+
+    # Replaced and closed hub connections must be disconnected
+    assert len(sim.open_hubs) <= 1
+    assert len(asyncio.all_tasks()) <= tasks_before
+    assert saves["runtime"] > 0
+
+    if baseline is not None:
+        growth = sum(stat.size_diff for stat in final.compare_to(baseline, "filename"))
+        assert growth < MAX_GROWTH_BYTES, f"heap grew by {growth} bytes after warm-up"
+
+    await client.async_close()
+    assert not sim.open_hubs
+
+
+def test_absent_device_keeps_state_within_grace(sim: HubSim) -> None:
+    async def _run() -> None:
+        client = api.KasaKe100Client("192.0.2.10", mac=HUB_MAC, rate_limit=1e9, rate_burst=10**9)
+        await client.async_refresh()
+        child = sim.children[0]
+        child.offline = True
+        await client.async_set_target_temp(child.device_id, 18)
+        assert child.device_id in client.pending
+
+        # Missing from the hub for a while (battery swap): nothing is dropped
+        sim.children.remove(child)
+        api.time.now += api.REMOVED_DEVICE_GRACE / 2
+        await client.async_refresh()
+        assert child.device_id in client.pending
+        assert child.device_id in client.runtime
+
+        sim.children.append(child)
+        child.offline = False
+        api.time.now += POLL_SECONDS
+        await client.async_refresh()
+        assert child.target_temperature == 18
+        assert child.device_id not in client._absent_since
+
+        # Gone for longer than the grace period: bookkeeping is released
+        child.offline = True
+        await client.async_set_target_temp(child.device_id, 19)
+        sim.children.remove(child)
+        await client.async_refresh()
+        api.time.now += api.REMOVED_DEVICE_GRACE
+        await client.async_refresh()
+        assert child.device_id not in client.pending
+        assert child.device_id not in client.runtime
+        await client.async_close()
+
+    asyncio.run(_run())
+
+
+@pytest.mark.skipif(not HAS_HASS_FIXTURE, reason="needs pytest-homeassistant-custom-component")
+@pytest.mark.asyncio
+async def test_entry_listeners_bounded(hass, enable_custom_integrations, sim: HubSim) -> None:
+    """Churn devices through the real platforms and entities of a set-up entry."""
+    from homeassistant.helpers import device_registry as dr
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+    from custom_components.kasa_ke100_min.const import DOMAIN
+
+    rng = random.Random(1)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=api.norm_mac(HUB_MAC),
+        data={"host": "192.0.2.10", "username": "u", "password": "p", "mac": api.norm_mac(HUB_MAC)},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    dev_reg = dr.async_get(hass)
+
+    # Every device has the same entities, so with a constant number of children
+    # the listener, state and task counts must not move
+    listeners = len(coordinator._listeners)
+    states = len(hass.states.async_all())
+    tasks = len(asyncio.all_tasks())
+    assert listeners > CHILDREN
+
+    for _ in range(ENTRY_CYCLES):
+        removed = sim.children[rng.randrange(len(sim.children))]
+        sim.churn_out(removed)
+        # Removing the HA device removes its entities, which drop their subscriptions
+        device = dev_reg.async_get_device(identifiers={(DOMAIN, removed.device_id)})
+        dev_reg.async_remove_device(device.id)
+        api.time.now += POLL_SECONDS
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        assert coordinator.last_update_success
+
+    live = {c.device_id for c in sim.children}
+    assert coordinator._device_listeners.keys() == live
+    assert coordinator.device_last_updated.keys() == live
+    assert len(coordinator._listeners) == listeners
+    assert len(hass.states.async_all()) == states
+    assert len(asyncio.all_tasks()) <= tasks
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not coordinator._listeners
+    assert not coordinator._device_listeners
+    assert not sim.open_hubs